@@ -0,0 +1,338 @@
+import csv
+from math import isfinite, sqrt
+
+import numpy as np
+import pandas as pd
+
+
+class RunningMoments:
+    """
+    Media y varianza de una serie calculadas en línea con el algoritmo de Welford.
+
+    Dos instancias pueden combinarse de forma exacta con `merge` (fórmula de Chan et al.), lo que
+    permite acumular resultados parciales por bloques o por procesos en paralelo.
+
+    Atributos
+    ----------
+    n : int
+        Número de observaciones acumuladas.
+
+    mean : float
+        Media de las observaciones.
+
+    m2 : float
+        Suma de cuadrados de las desviaciones respecto a la media.
+    """
+
+    __slots__ = ("n", "mean", "m2")
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def push(self, value: float) -> None:
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+
+    def push_many(self, values: np.ndarray) -> None:
+        values = np.asarray(values, dtype=float)
+        if values.size == 0:
+            return
+        batch = RunningMoments()
+        batch.n = int(values.size)
+        batch.mean = float(values.mean())
+        batch.m2 = float(((values - batch.mean) ** 2).sum())
+        self.merge(batch)
+
+    def merge(self, other: "RunningMoments") -> "RunningMoments":
+        if other.n == 0:
+            return self
+        if self.n == 0:
+            self.n, self.mean, self.m2 = other.n, other.mean, other.m2
+            return self
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta ** 2 * self.n * other.n / n
+        self.n = n
+        return self
+
+    @property
+    def variance(self) -> float | None:
+        """
+        Varianza muestral (ddof=1). Retorna `None` con menos de dos observaciones.
+        """
+        if self.n < 2:
+            return None
+        return self.m2 / (self.n - 1)
+
+    @property
+    def mean_square(self) -> float | None:
+        """
+        Media de los cuadrados de las observaciones, calculada a partir de la media y `m2`.
+        """
+        if self.n == 0:
+            return None
+        return self.m2 / self.n + self.mean ** 2
+
+
+class ForecastAccumulator:
+    """
+    Métricas de precisión y cobertura de un pronóstico acumuladas en memoria constante.
+
+    Acumula, sin almacenar las predicciones individuales, los momentos del error (`y_pred - y`),
+    del error absoluto, la tasa de acierto direccional y, cuando se entregan intervalos, la
+    cobertura y el ancho de los intervalos de predicción. Las instancias son combinables de forma
+    exacta con `merge`.
+
+    Los pares con `y` o `y_pred` no finitos (e.g. `NaN` en las últimas ventanas, donde `y_t+h` aún
+    no se observa) se descartan y se cuentan en `skipped`, tanto en `update` como en `update_many`.
+    De los pares válidos, solo los que tienen ambos límites finitos entran al cálculo de cobertura.
+
+    Raises
+    ------
+    ValueError
+        - Si se entrega solo uno de `lower` o `upper`.
+
+    Ejemplo
+    -------
+    ```python
+    acc = ForecastAccumulator()
+    acc.update(y=0.002, y_pred=0.001, lower=-0.01, upper=0.012)
+    acc.update_many(y=y_test, y_pred=y_pred)
+
+    acc.summary()
+    # {'n': ..., 'bias': ..., 'rmse': ..., 'mae': ..., 'directional_accuracy': ..., ...}
+    ```
+    """
+
+    __slots__ = ("error", "abs_error", "width", "hits", "covered", "skipped")
+
+    def __init__(self):
+        self.error = RunningMoments()
+        self.abs_error = RunningMoments()
+        self.width = RunningMoments()
+        self.hits = 0
+        self.covered = 0
+        self.skipped = 0
+
+    @staticmethod
+    def _check_bounds(lower, upper) -> bool:
+        if (lower is None) != (upper is None):
+            raise ValueError("Se deben entregar ambos límites `lower` y `upper`, o ninguno.")
+        return lower is not None
+
+    def update(
+        self,
+        y: float,
+        y_pred: float,
+        lower: float | None = None,
+        upper: float | None = None
+    ) -> None:
+        has_interval = self._check_bounds(lower, upper)
+        y = float(y)
+        y_pred = float(y_pred)
+        if has_interval:
+            lower = float(lower)
+            upper = float(upper)
+        if not (isfinite(y) and isfinite(y_pred)):
+            self.skipped += 1
+            return
+
+        error = y_pred - y
+        self.error.push(error)
+        self.abs_error.push(abs(error))
+        self.hits += int((y_pred > 0) - (y_pred < 0) == (y > 0) - (y < 0))
+
+        if has_interval and isfinite(lower) and isfinite(upper):
+            self.width.push(upper - lower)
+            self.covered += int(lower <= y <= upper)
+
+    def update_many(
+        self,
+        y: np.ndarray,
+        y_pred: np.ndarray,
+        lower: np.ndarray | None = None,
+        upper: np.ndarray | None = None
+    ) -> None:
+        """
+        Versión vectorizada de `update` para un bloque de predicciones.
+        """
+        has_interval = self._check_bounds(lower, upper)
+        y = np.asarray(y, dtype=float)
+        y_pred = np.asarray(y_pred, dtype=float)
+        valid = np.isfinite(y) & np.isfinite(y_pred)
+        self.skipped += int((~valid).sum())
+
+        error = y_pred[valid] - y[valid]
+        self.error.push_many(error)
+        self.abs_error.push_many(np.abs(error))
+        self.hits += int((np.sign(y_pred[valid]) == np.sign(y[valid])).sum())
+
+        if has_interval:
+            lower = np.asarray(lower, dtype=float)
+            upper = np.asarray(upper, dtype=float)
+            valid &= np.isfinite(lower) & np.isfinite(upper)
+            y = y[valid]
+            self.width.push_many(upper[valid] - lower[valid])
+            self.covered += int(((lower[valid] <= y) & (y <= upper[valid])).sum())
+
+    def merge(self, other: "ForecastAccumulator") -> "ForecastAccumulator":
+        self.error.merge(other.error)
+        self.abs_error.merge(other.abs_error)
+        self.width.merge(other.width)
+        self.hits += other.hits
+        self.covered += other.covered
+        self.skipped += other.skipped
+        return self
+
+    def summary(self) -> dict:
+        n = self.error.n
+        mse = self.error.mean_square
+        variance = self.error.variance
+        return {
+            "n": n,
+            "bias": self.error.mean if n else None,
+            "std_error": None if variance is None else sqrt(variance),
+            "mse": mse,
+            "rmse": None if mse is None else sqrt(mse),
+            "mae": self.abs_error.mean if n else None,
+            "directional_accuracy": self.hits / n if n else None,
+            "n_intervals": self.width.n,
+            "coverage": self.covered / self.width.n if self.width.n else None,
+            "mean_interval_width": self.width.mean if self.width.n else None,
+            "skipped": self.skipped,
+        }
+
+
+class BacktestMetrics:
+    """
+    Métricas fuera de muestra desagregadas por especificación y horizonte de predicción.
+
+    Reemplaza la acumulación de cada predicción en listas de Python: cada par
+    (especificación, horizonte) mantiene un `ForecastAccumulator`, por lo que la memoria depende
+    solo del número de combinaciones y no del número de ventanas evaluadas. Opcionalmente, las
+    predicciones individuales se escriben a disco en bloques de `spill_chunk` filas.
+
+    Parámetros
+    ----------
+    spill_path : str, opcional
+        Ruta de un archivo CSV donde se escriben las predicciones individuales. Si el archivo
+        existe, se sobrescribe en la primera escritura de la instancia, de modo que su contenido
+        corresponde siempre a los acumuladores. Si es `None`, no se guardan predicciones individuales.
+
+    spill_chunk : int, predeterminado=10_000
+        Número de filas que se mantienen en memoria antes de escribirlas a `spill_path`.
+
+    Ejemplo
+    -------
+    ```python
+    metrics = BacktestMetrics(spill_path="predictions.csv")
+
+    for train_idx, test_idx in indexes:
+        ...
+        metrics.update(spec_name, step, y=y_test, y_pred=y_pred)
+
+    metrics.flush()
+    metrics.to_frame().sort_values("rmse").head()
+
+    # Resultados parciales de varios procesos se combinan de forma exacta
+    total = BacktestMetrics()
+    for partial in partial_results:
+        total.merge(partial)
+    ```
+
+    Notas
+    -----
+    - `merge` combina los acumuladores, no los archivos de `spill_path`; cada proceso debe escribir
+      a su propio archivo.
+    - Las instancias no mantienen archivos abiertos, por lo que pueden enviarse entre procesos.
+    """
+
+    SPILL_COLUMNS = ["spec", "horizon", "y", "y_pred", "lower", "upper"]
+
+    def __init__(self, spill_path: str | None = None, spill_chunk: int = 10_000):
+        self.accumulators = {}
+        self.spill_path = spill_path
+        self.spill_chunk = spill_chunk
+        self._pending = []
+        self._spilled = False
+
+    def _accumulator(self, spec: str, horizon: int) -> ForecastAccumulator:
+        key = (spec, horizon)
+        if key not in self.accumulators:
+            self.accumulators[key] = ForecastAccumulator()
+        return self.accumulators[key]
+
+    def update(
+        self,
+        spec: str,
+        horizon: int,
+        y: float,
+        y_pred: float,
+        lower: float | None = None,
+        upper: float | None = None
+    ) -> None:
+        self._accumulator(spec, horizon).update(y, y_pred, lower, upper)
+
+        if self.spill_path is not None:
+            self._pending.append([spec, horizon, y, y_pred, lower, upper])
+            if len(self._pending) >= self.spill_chunk:
+                self.flush()
+
+    def update_many(
+        self,
+        spec: str,
+        horizon: int,
+        y: np.ndarray,
+        y_pred: np.ndarray,
+        lower: np.ndarray | None = None,
+        upper: np.ndarray | None = None
+    ) -> None:
+        self._accumulator(spec, horizon).update_many(y, y_pred, lower, upper)
+
+        if self.spill_path is not None:
+            n = len(y)
+            lower = [None] * n if lower is None else lower
+            upper = [None] * n if upper is None else upper
+            self._pending.extend(
+                [spec, horizon, *row] for row in zip(y, y_pred, lower, upper)
+            )
+            if len(self._pending) >= self.spill_chunk:
+                self.flush()
+
+    def flush(self) -> None:
+        """
+        Escribe en `spill_path` las predicciones pendientes. La primera escritura de la instancia
+        trunca el archivo y escribe el encabezado; las siguientes agregan filas.
+        """
+        if self.spill_path is None or not self._pending:
+            return
+        mode = "a" if self._spilled else "w"
+        with open(self.spill_path, mode, newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            if not self._spilled:
+                writer.writerow(self.SPILL_COLUMNS)
+            writer.writerows(self._pending)
+        self._pending = []
+        self._spilled = True
+
+    def merge(self, other: "BacktestMetrics") -> "BacktestMetrics":
+        other.flush()
+        for (spec, horizon), accumulator in other.accumulators.items():
+            self._accumulator(spec, horizon).merge(accumulator)
+        return self
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Retorna un DataFrame con el resumen de métricas, indexado por especificación y horizonte.
+        """
+        rows = [
+            {"spec": spec, "horizon": horizon, **accumulator.summary()}
+            for (spec, horizon), accumulator in self.accumulators.items()
+        ]
+        df = pd.DataFrame(rows, columns=["spec", "horizon"] + list(ForecastAccumulator().summary()))
+        return df.set_index(["spec", "horizon"]).sort_index()
@@ -0,0 +1,64 @@
+class RingBuffer:
+    """
+    Buffer circular de tamaño fijo para almacenar los últimos `capacity` valores de una serie.
+
+    Las inserciones y lecturas por rezago son O(1): no se desplazan elementos ni se reserva memoria
+    después de la construcción. Se utiliza para mantener el estado de rezagos en el modo streaming.
+
+    Parámetros
+    ----------
+    capacity : int
+        Número máximo de valores almacenados. Debe ser mayor o igual a 1.
+
+    fill_value : float, predeterminado=float("nan")
+        Valor con el que se inicializan las posiciones vacías del buffer.
+
+    Raises
+    ------
+    ValueError
+        - Si `capacity` es menor que 1.
+
+    IndexError
+        - Si el rezago solicitado en `lag` está fuera del rango [0, capacity).
+
+    Ejemplo
+    -------
+    ```python
+    buffer = RingBuffer(capacity=3)
+    for value in [1.0, 2.0, 3.0, 4.0]:
+        buffer.push(value)
+
+    buffer.lag(0)  # 4.0 (valor más reciente)
+    buffer.lag(2)  # 2.0
+    ```
+    """
+
+    __slots__ = ("capacity", "_values", "_head", "_size")
+
+    def __init__(self, capacity: int, fill_value: float = float("nan")):
+        if capacity < 1:
+            raise ValueError("capacity debe ser mayor o igual a 1.")
+        self.capacity = capacity
+        self._values = [fill_value] * capacity
+        self._head = -1
+        self._size = 0
+
+    def push(self, value: float) -> None:
+        self._head = (self._head + 1) % self.capacity
+        self._values[self._head] = value
+        if self._size < self.capacity:
+            self._size += 1
+
+    def lag(self, k: int) -> float:
+        """
+        Retorna el valor con rezago `k`, donde `k=0` es el valor más reciente.
+        """
+        if not 0 <= k < self.capacity:
+            raise IndexError(f"Rezago {k} fuera de rango para capacity={self.capacity}.")
+        return self._values[(self._head - k) % self.capacity]
+
+    def is_full(self) -> bool:
+        return self._size == self.capacity
+
+    def __len__(self) -> int:
+        return self._size
@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from math import isfinite
+from typing import AsyncIterator
+
+
+SYMBOLS = ("usd_clp", "copper")
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Tick:
+    """
+    Cotización individual recibida durante la sesión.
+
+    Atributos
+    ----------
+    timestamp : datetime
+        Fecha y hora de la cotización según la fuente.
+
+    symbol : str
+        Instrumento cotizado. Debe ser uno de `SYMBOLS` ('usd_clp' o 'copper').
+
+    price : float
+        Precio cotizado.
+
+    received_at : float
+        Instante de recepción según `time.perf_counter()`. Se utiliza para medir la latencia
+        extremo a extremo entre la llegada de la cotización y la publicación del pronóstico.
+    """
+    timestamp: datetime
+    symbol: str
+    price: float
+    received_at: float
+
+
+def parse_tick(line: str, sep: str = ";") -> Tick | None:
+    """
+    Convierte una línea `timestamp;symbol;price` en un `Tick`.
+
+    Retorna `None` para líneas vacías o de encabezado. Lanza `ValueError` si la línea está mal
+    formada, si el instrumento no pertenece a `SYMBOLS` o si el precio no es positivo.
+    """
+    line = line.strip()
+    if not line or line.startswith("timestamp"):
+        return None
+
+    fields = line.split(sep)
+    if len(fields) != 3:
+        raise ValueError(f"Línea de tick mal formada: {line!r}")
+
+    timestamp, symbol, price = fields
+    if symbol not in SYMBOLS:
+        raise ValueError(f"Instrumento desconocido en tick: {symbol!r}")
+    price = float(price)
+    if not isfinite(price) or price <= 0:
+        raise ValueError(f"Precio inválido en tick: {line!r}")
+
+    return Tick(
+        timestamp=datetime.fromisoformat(timestamp),
+        symbol=symbol,
+        price=price,
+        received_at=time.perf_counter(),
+    )
+
+
+def _parse_or_skip(line: str, sep: str) -> Tick | None:
+    """
+    Igual que `parse_tick`, pero registra y descarta las líneas inválidas para no interrumpir
+    la sesión en vivo.
+    """
+    try:
+        return parse_tick(line, sep=sep)
+    except ValueError as e:
+        logger.warning("Se descarta tick inválido: %s", e)
+        return None
+
+
+async def file_tick_source(
+    file_path: str,
+    delay: float = 0.0,
+    sep: str = ";"
+) -> AsyncIterator[Tick]:
+    """
+    Reproduce cotizaciones desde un archivo de texto como si llegaran en vivo.
+
+    Cada línea debe tener el formato `timestamp;symbol;price`, por ejemplo
+    `2024-10-25 09:31:02;usd_clp;951.3`. Se ignora el encabezado si existe y las líneas inválidas
+    se registran con `logging` y se descartan.
+
+    Parámetros
+    ----------
+    file_path : str
+        Ruta del archivo a reproducir.
+
+    delay : float, predeterminado=0.0
+        Segundos de espera entre cotizaciones para simular el ritmo de mercado.
+
+    sep : str, predeterminado=";"
+        Separador de campos.
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        for line in f:
+            tick = _parse_or_skip(line, sep=sep)
+            if tick is None:
+                continue
+            yield tick
+            await asyncio.sleep(delay)
+
+
+async def socket_tick_source(
+    host: str,
+    port: int,
+    sep: str = ";"
+) -> AsyncIterator[Tick]:
+    """
+    Consume cotizaciones desde un socket TCP, una por línea, con el mismo formato que
+    `file_tick_source`. Las líneas inválidas se registran y descartan; la fuente solo termina
+    cuando el servidor cierra la conexión.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            tick = _parse_or_skip(line.decode("utf-8", errors="replace"), sep=sep)
+            if tick is not None:
+                yield tick
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+def get_tick_source(source: str, delay: float = 0.0) -> AsyncIterator[Tick]:
+    """
+    Construye la fuente de cotizaciones a partir de su descripción.
+
+    - `tcp://host:port` consume desde un socket TCP.
+    - Cualquier otro valor se interpreta como ruta a un archivo de reproducción.
+    """
+    if source.startswith("tcp://"):
+        host, port = source[len("tcp://"):].rsplit(":", 1)
+        return socket_tick_source(host, int(port))
+    return file_tick_source(source, delay=delay)
@@ -1,11 +1,22 @@
 import os
 import argparse
+import asyncio
+import numpy as np
 import pandas as pd
 import pprint
 
-from src.preprocessor import preprocessor, train_inference_split
+from src.preprocessor import (
+    preprocessor,
+    train_inference_split,
+    lag_names,
+    DEFAULT_HORIZONS,
+    DEFAULT_Y_LAGS,
+    DEFAULT_COPPER_LAGS,
+)
 from src.model import TimeSeriesLinearRegression
 from lib.calendar import get_market_calendar
+from lib.ticks import get_tick_source
+from src.streaming import StreamingForecaster, run_stream, check_against_batch
 
 
 def parse_args():
@@ -19,6 +30,35 @@ def parse_args():
         type=float,
         default=.95,
     )
+    parser.add_argument(
+        "--horizons",
+        type=int,
+        default=DEFAULT_HORIZONS,
+        help="Número de horizontes de predicción en días hábiles (t+1, ..., t+H).",
+    )
+    parser.add_argument(
+        "--y-lags",
+        type=int,
+        default=DEFAULT_Y_LAGS,
+        help="Profundidad de rezagos del retorno del tipo de cambio (y_t+0, ..., y_t-L).",
+    )
+    parser.add_argument(
+        "--copper-lags",
+        type=int,
+        default=DEFAULT_COPPER_LAGS,
+        help="Profundidad de rezagos del retorno del cobre (copper_t+0, ..., copper_t-L).",
+    )
+    parser.add_argument(
+        "--stream-source",
+        default=None,
+        help="Archivo de ticks a reproducir o 'tcp://host:port'. Activa el modo streaming.",
+    )
+    parser.add_argument(
+        "--stream-delay",
+        type=float,
+        default=0.0,
+        help="Segundos entre ticks al reproducir un archivo.",
+    )
 
     return parser.parse_args()
 
@@ -32,128 +72,111 @@ if __name__ == "__main__":
 
     # Se obtiene el Calendario de Mercado para excluir dias no hábiles.
     # Los días no habiles tienen retorno = 0.0 lo que introduce error en el cálculo de estimadores.
+    # El calendario se extiende lo necesario para cubrir las fechas de todos los horizontes.
+    calendar_end = max(
+        pd.Timestamp("2024-11-01"),
+        pd.Timestamp(args.last_train_date) + pd.Timedelta(days=2 * args.horizons + 7),
+    )
     market_calendar = get_market_calendar(
-        market="CME_Currency", date_interval=["2016-12-28", "2024-11-01"]
+        market="CME_Currency",
+        date_interval=["2016-12-28", calendar_end.strftime("%Y-%m-%d")]
     )
 
     # Procesamiento de datos
     #   - Cálculo de primeras diferencias y rezagos de la variable endógena.
     #   - Se añade variable exógina: Diferencias y Rezagos del precio del cobre.
-    df = preprocessor(df, market_calendar)
+    df = preprocessor(
+        df,
+        market_calendar,
+        horizons=args.horizons,
+        y_lags=args.y_lags,
+        copper_lags=args.copper_lags,
+    )
 
     # Se separa la base en set de entrenamiento e inferencia
     df_train, df_inference, next_dates = train_inference_split(
-        df, args.last_train_date, market_calendar=market_calendar
+        df, args.last_train_date, market_calendar=market_calendar, horizons=args.horizons
     )
 
-    # Se genera un dataset de entrenamiento por cada horizonte de prediccion.
-    df_train_t1 = df_train.dropna(subset=["y_t+1"]).reset_index(drop=True)
-    df_train_t2 = df_train.dropna(subset=["y_t+2"]).reset_index(drop=True)
-    df_train_t3 = df_train.dropna(subset=["y_t+3"]).reset_index(drop=True)
-
     # Se definen las variables independientes.
     # Ver notebooks para detalles de la especificacion y experimento.
     #   - y_t+0: retorno del tipo de cambio de hoy. En simple: diferencia porcental entre el precio de ayer y hoy.
     #   - y_t-1: retorno del tipo de cambio de ayer. En simple: diferencia porcental entre el precio de antes de ayer y ayer.
     #   - Misma definicion para los retornos del cobre.
-    independent_variables = [
-        "y_t+0", "y_t-1", "copper_t+0", "copper_t-1", "copper_t-2", "copper_t-3"
-    ]
-
-    # Se generan las matrices de caracteristicas por cada horizonte de predicción
-    X_train_t1 = df_train_t1[independent_variables]
-    X_train_t2 = df_train_t2[independent_variables]
-    X_train_t3 = df_train_t3[independent_variables]
-
-    # Se generan los vectores de la variable dependiente por cada horizonte de predicción.
-    y_train_t1 = df_train_t1["y_t+1"]
-    y_train_t2 = df_train_t2["y_t+2"]
-    y_train_t3 = df_train_t3["y_t+3"]
-
-    # Se genera la matriz de caracteísticas para la inferencia
-    X_inference = df_inference[independent_variables]
-
-    # Se define una instancia del Modelo de Regresión Personalizado por cada horizonte de prediccion.
-    # La unica diferencia entre este modelo y un modelo de Regresión Lineal es que el modelo
-    # personalizado almacena los errores fuera de muestra dentro del conjunto de entrenamient
-    # para el posterior calculo de intervalo de confianza.
-    model_t1 = TimeSeriesLinearRegression(
-        confidence_level=args.confidence_level
-    )
-    model_t2 = TimeSeriesLinearRegression(
-        confidence_level=args.confidence_level
-    )
-    model_t3 = TimeSeriesLinearRegression(
-        confidence_level=args.confidence_level
+    # Por defecto: y_t+0, y_t-1, copper_t+0, copper_t-1, copper_t-2, copper_t-3.
+    independent_variables = (
+        lag_names("y", args.y_lags) + lag_names("copper", args.copper_lags)
     )
 
-    # Se ajustan los modelos.
-    model_t1.fit(X_train_t1, y_train_t1)
-    model_t2.fit(X_train_t2, y_train_t2)
-    model_t3.fit(X_train_t3, y_train_t3)
-
-    # Se generan las predicciones por horizonte de predicción.
-    y_pred_t1, lower_bound_t1, upper_bound_t1 = model_t1.predict(X_inference)
-    y_pred_t2, lower_bound_t2, upper_bound_t2 = model_t2.predict(X_inference)
-    y_pred_t3, lower_bound_t3, upper_bound_t3 = model_t3.predict(X_inference)
+    # Se generan las matrices de caracteísticas de entrenamiento (una sola vez para todos los
+    # horizontes) y de inferencia.
+    X_train = df_train[independent_variables].to_numpy(dtype=float)
+    X_inference = df_inference[independent_variables]
 
     # Identificación de datos para reporte final.
     y_t0 = float(df_inference["usd_clp"][0])
-
-    y_actual_usd_t1 = float(df_inference["usd_clp_t+1"][0])
-    y_actual_usd_t2 = float(df_inference["usd_clp_t+2"][0])
-    y_actual_usd_t3 = float(df_inference["usd_clp_t+3"][0])
-
-    y_actual_var_t1 = float(df_inference["y_t+1"][0])
-    y_actual_var_t2 = float(df_inference["y_t+2"][0])
-    y_actual_var_t3 = float(df_inference["y_t+3"][0])
-
-    y_pred_usd_t1 = y_t0 * (1 + y_pred_t1)
-    y_pred_usd_t2 = y_t0 * (1 + y_pred_t2)
-    y_pred_usd_t3 = y_t0 * (1 + y_pred_t3)
-
-    y_pred_usd_t1_ci = [y_t0 * (1 + lower_bound_t1),
-                        y_t0 * (1 + upper_bound_t1)]
-    y_pred_usd_t2_ci = [y_t0 * (1 + lower_bound_t2),
-                        y_t0 * (1 + upper_bound_t2)]
-    y_pred_usd_t3_ci = [y_t0 * (1 + lower_bound_t3),
-                        y_t0 * (1 + upper_bound_t3)]
-
     y_date_t0 = df_inference["dates"][0].strftime('%Y-%m-%d')
 
+    models = {}
+    forecast = {}
+    for h in range(1, args.horizons + 1):
+        # Se excluyen las filas sin variable dependiente observada para el horizonte de prediccion.
+        y_train_h = df_train[f"y_t+{h}"].to_numpy(dtype=float)
+        observed = ~np.isnan(y_train_h)
+        X_train_h = X_train[observed]
+        y_train_h = y_train_h[observed]
+
+        # Se define una instancia del Modelo de Regresión Personalizado por cada horizonte de prediccion.
+        # La unica diferencia entre este modelo y un modelo de Regresión Lineal es que el modelo
+        # personalizado almacena los errores fuera de muestra dentro del conjunto de entrenamient
+        # para el posterior calculo de intervalo de confianza.
+        model = TimeSeriesLinearRegression(
+            confidence_level=args.confidence_level
+        )
+        model.fit(X_train_h, y_train_h)
+        models[h] = model
+
+        y_pred, lower_bound, upper_bound = model.predict(X_inference)
+
+        y_actual_usd = float(df_inference[f"usd_clp_t+{h}"][0])
+        y_actual_var = float(df_inference[f"y_t+{h}"][0])
+
+        forecast[f"t+{h}"] = {
+            f"date_t+{h}": next_dates[h - 1],
+            "usd_t+0": y_t0,
+            "usd_forecast": y_t0 * (1 + y_pred),
+            "usd_forecast_confidence": {
+                "confidence_level": args.confidence_level,
+                "interval": [y_t0 * (1 + lower_bound), y_t0 * (1 + upper_bound)],
+            },
+            "usd_observed": None if pd.isna(y_actual_usd) else y_actual_usd,
+            "variation_forecast": y_pred,
+            "variation_observed": None if pd.isna(y_actual_var) else y_actual_var,
+        }
+
     # Generacion de reporte final
     prediction = {
         "current_date": y_date_t0,
-        "forecast": {
-            "t+1": {
-                "date_t+1": next_dates[0],
-                "usd_t+0": y_t0,
-                "usd_forecast": y_pred_usd_t1,
-                "usd_forecast_confidence": {"confidence_level": args.confidence_level, "interval": y_pred_usd_t1_ci},
-                "usd_observed": None if pd.isna(y_actual_usd_t1) else y_actual_usd_t1,
-                "variation_forecast": y_pred_t1,
-                "variation_observed": None if pd.isna(y_actual_var_t1) else y_actual_var_t1,
-            },
-            "t+2": {
-                "date_t+2": next_dates[1],
-                "usd_t+0": y_t0,
-                "usd_forecast": y_pred_usd_t2,
-                "usd_forecast_confidence": {"confidence_level": args.confidence_level, "interval": y_pred_usd_t2_ci},
-                "usd_observed": None if pd.isna(y_actual_usd_t2) else y_actual_usd_t2,
-                "variation_forecast": y_pred_t2,
-                "variation_observed": None if pd.isna(y_actual_var_t2) else y_actual_var_t2,
-            },
-            "t+3": {
-                "date_t+1": next_dates[2],
-                "usd_t+0": y_t0,
-                "usd_forecast": y_pred_usd_t3,
-                "usd_forecast_confidence": {"confidence_level": args.confidence_level, "interval": y_pred_usd_t3_ci},
-                "usd_observed": None if pd.isna(y_actual_usd_t3) else y_actual_usd_t3,
-                "variation_forecast": y_pred_t3,
-                "variation_observed": None if pd.isna(y_actual_var_t3) else y_actual_var_t3,
-            },
-        }
+        "forecast": forecast,
     }
 
     # Reporte final para el usuario.
     pprint.pp(prediction)
+
+    # Modo streaming: se actualiza el pronóstico con cada cotización de USD/CLP o cobre
+    # reutilizando los coeficientes ya estimados. Se reportan estadísticas de latencia por tick.
+    if args.stream_source is not None:
+        check_against_batch(models, independent_variables, df_train)
+        forecaster = StreamingForecaster(
+            models=models,
+            independent_variables=independent_variables,
+            history=df_train,
+        )
+        latency = asyncio.run(
+            run_stream(
+                forecaster,
+                get_tick_source(args.stream_source, delay=args.stream_delay),
+                on_forecast=pprint.pp,
+            )
+        )
+        pprint.pp({"latency": latency})
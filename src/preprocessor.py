@@ -2,6 +2,7 @@ import os
 import sys
 import pandas as pd
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 
 # fmt: off
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -10,7 +11,61 @@ from lib.exog_data import get_yfinance_data
 # fmt: on
 
 
-def preprocessor(df: pd.DataFrame, market_calendar) -> pd.DataFrame:
+# Especificación por defecto: horizontes t+1..t+3, y_t+0..y_t-1 y copper_t+0..copper_t-3.
+# Ver notebooks para detalles de la especificacion y experimento.
+DEFAULT_HORIZONS = 3
+DEFAULT_Y_LAGS = 1
+DEFAULT_COPPER_LAGS = 3
+
+
+def lag_names(prefix: str, lags: int) -> list[str]:
+    """
+    Retorna los nombres de las columnas de rezagos de una variable, desde t+0 hasta t-`lags`.
+
+    Ejemplo: `lag_names("copper", 3)` -> ['copper_t+0', 'copper_t-1', 'copper_t-2', 'copper_t-3'].
+    """
+    return [f"{prefix}_t+0"] + [f"{prefix}_t-{k}" for k in range(1, lags + 1)]
+
+
+def lead_lag_windows(values: np.ndarray, lags: int, leads: int = 0) -> np.ndarray:
+    """
+    Genera ventanas deslizantes de adelantos y rezagos sobre una serie.
+
+    La fila `t` del resultado contiene `values[t - lags - 1], ..., values[t], ..., values[t + leads]`,
+    por lo que `values[t]` se ubica en la columna `lags + 1`. Los extremos sin información se rellenan
+    con `NaN`, lo que genera una copia de la serie con relleno. El resultado es una vista de solo
+    lectura sobre esa copia creada con `numpy.lib.stride_tricks.sliding_window_view`: las ventanas no
+    duplican la serie por cada adelanto o rezago, pero cualquier operación aritmética sobre ellas
+    (e.g. diferencias entre columnas) genera un arreglo nuevo.
+
+    Parámetros
+    ----------
+    values : np.ndarray
+        Serie unidimensional ordenada cronológicamente.
+
+    lags : int
+        Número de rezagos de la primera diferencia que se desean calcular (se requiere un precio extra).
+
+    leads : int, predeterminado=0
+        Número de periodos hacia adelante.
+
+    Retorna
+    -------
+    np.ndarray of shape (len(values), lags + leads + 2)
+    """
+    padded = np.concatenate([
+        np.full(lags + 1, np.nan), values, np.full(leads, np.nan)
+    ])
+    return sliding_window_view(padded, lags + leads + 2)
+
+
+def preprocessor(
+    df: pd.DataFrame,
+    market_calendar,
+    horizons: int = DEFAULT_HORIZONS,
+    y_lags: int = DEFAULT_Y_LAGS,
+    copper_lags: int = DEFAULT_COPPER_LAGS
+) -> pd.DataFrame:
     """
     Preprocesa un DataFrame para preparar datos de series de tiempo, enfocándose en la variable 'usd_clp' y
     enriqueciendo con información de precios del cobre.
@@ -29,13 +84,18 @@ def preprocessor(df: pd.DataFrame, market_calendar) -> pd.DataFrame:
        - Elimina los días no hábiles para evitar errores en el cálculo de estimadores.
 
     4. **Creación de variables rezagadas y adelantadas:**
-       - Genera columnas con valores rezagados (`t-1`) y adelantados (`t+1`, `t+2`, `t+3`) de 'usd_clp'.
+       - Genera columnas con valores rezagados (`t-1`) y adelantados (`t+1`, ..., `t+horizons`) de 'usd_clp'.
+       - La matriz completa de adelantos y rezagos se construye en una sola pasada con ventanas deslizantes
+         (ver `lead_lag_windows`), en lugar de un `shift` por columna. Las columnas resultantes
+         ('usd_clp_t-1', 'usd_clp_t+h', 'y_t-k' e 'y_t+h', 2H+L+2 en total) sí se materializan en el
+         DataFrame, en un único bloque, ya que los adelantos deben calcularse sobre los días hábiles
+         antes de eliminar filas y el reporte los consulta por nombre.
 
     5. **Transformación para estacionariedad:**
-       - Calcula la primera diferencia logarítmica de 'usd_clp' para convertir la serie a estacionaria, creando las columnas 'y_t+0', 'y_t-1' y 'y_t-2'.
+       - Calcula la primera diferencia logarítmica de 'usd_clp' para convertir la serie a estacionaria, creando las columnas 'y_t+0', 'y_t-1', ..., 'y_t-{y_lags}'.
 
-    6. **Pronósticos a 3 pasos adelante:**
-       - Calcula diferencias logarítmicas para pronósticos a 1, 2 y 3 pasos adelante, generando las columnas 'y_t+1', 'y_t+2' y 'y_t+3'.
+    6. **Pronósticos a H pasos adelante:**
+       - Calcula diferencias logarítmicas para pronósticos a 1, ..., `horizons` pasos adelante, generando las columnas 'y_t+1', ..., 'y_t+{horizons}'.
 
     7. **Integración de precios del cobre:**
        - Obtiene datos de precios del cobre utilizando la función `get_yfinance_data` con el ticker 'HG=F' (futuro del cobre a 3 meses) y un intervalo de fechas específico.
@@ -47,10 +107,10 @@ def preprocessor(df: pd.DataFrame, market_calendar) -> pd.DataFrame:
         - TODO: cambiar ticker o validar data de tipos de cambio para evitar valores nulos al cruzar los datos.
 
     9. **Transformación de precios del cobre:**
-       - Calcula la primera diferencia logarítmica de 'copper_close' para convertir la serie a estacionaria, creando las columnas 'copper_t+0', 'copper_t-1', 'copper_t-2' y 'copper_t-3'.
+       - Calcula la primera diferencia logarítmica de 'copper_close' para convertir la serie a estacionaria, creando las columnas 'copper_t+0', 'copper_t-1', ..., 'copper_t-{copper_lags}'.
 
     10. **Limpieza final:**
-        - Elimina filas que contienen valores nulos en las columnas 'usd_clp' y 'copper_t-3' para asegurar la integridad de los datos preprocesados.
+        - Elimina filas que contienen valores nulos en 'usd_clp' y en los rezagos más profundos de 'y' y 'copper' para asegurar la integridad de los datos preprocesados.
 
     Parámetros
     ----------
@@ -61,12 +121,26 @@ def preprocessor(df: pd.DataFrame, market_calendar) -> pd.DataFrame:
         Objeto que representa el calendario de mercado cambiario utilizado para determinar los días hábiles.
         Debe ser compatible con la función `is_business_day`.
 
+    horizons : int, predeterminado=DEFAULT_HORIZONS (3)
+        Número de horizontes de predicción H. Se generan 'usd_clp_t+h' e 'y_t+h' para h = 1, ..., H.
+
+    y_lags : int, predeterminado=DEFAULT_Y_LAGS (1)
+        Profundidad de rezagos del retorno del tipo de cambio. Se generan 'y_t+0', ..., 'y_t-{y_lags}'.
+
+    copper_lags : int, predeterminado=DEFAULT_COPPER_LAGS (3)
+        Profundidad de rezagos del retorno del cobre. Se generan 'copper_t+0', ..., 'copper_t-{copper_lags}'.
+
     Retorna
     -------
     pd.DataFrame
         DataFrame preprocesado que incluye variables rezagadas, adelantadas, diferencias logarítmicas
         y datos integrados de precios del cobre, listo para su uso en modelos de series de tiempo.
 
+    Raises
+    ------
+    ValueError
+        - Si `horizons` es menor que 1 o si `y_lags` o `copper_lags` son negativos.
+
     Notas
     -----
     - La función `is_business_day` se utiliza para identificar días hábiles según el calendario proporcionado.
@@ -75,7 +149,7 @@ def preprocessor(df: pd.DataFrame, market_calendar) -> pd.DataFrame:
       suposición común en el análisis de series de tiempo.
     - Es importante que el DataFrame de entrada esté correctamente formateado y contenga las columnas necesarias
       para evitar errores durante el preprocesamiento.
-    - La eliminación de filas con valores nulos en 'usd_clp' y 'copper_t-3' es crucial para garantizar que
+    - La eliminación de filas con valores nulos en 'usd_clp' y en los rezagos más profundos es crucial para garantizar que
       los datos estén completos y sean consistentes para el modelado posterior.
 
     Ejemplo
@@ -86,9 +160,17 @@ def preprocessor(df: pd.DataFrame, market_calendar) -> pd.DataFrame:
     # Supongamos que 'df' es un DataFrame con las columnas 'dates' e 'iata'
     # y 'market_calendar' es un objeto calendario adecuado.
     df_preprocesado = preprocessor(df, market_calendar)
+
+    # Horizontes de 1 a 20 días hábiles
+    df_preprocesado = preprocessor(df, market_calendar, horizons=20)
     ```
     """
 
+    if horizons < 1:
+        raise ValueError("horizons debe ser mayor o igual a 1.")
+    if y_lags < 0 or copper_lags < 0:
+        raise ValueError("y_lags y copper_lags deben ser mayores o iguales a 0.")
+
     df["dates"] = pd.to_datetime(df["dates"])
     df = df.sort_values(by="dates", ascending=True).reset_index(drop=True)
     df.rename(columns={"iata": "usd_clp"}, inplace=True)
@@ -101,20 +183,36 @@ def preprocessor(df: pd.DataFrame, market_calendar) -> pd.DataFrame:
     df = df.query("dummy_bd == 1").reset_index(drop=True)
     df.drop("dummy_bd", axis=1, inplace=True)
 
-    df["usd_clp_t-1"] = df["usd_clp"].shift(1)
-    df["usd_clp_t+1"] = df["usd_clp"].shift(-1)
-    df["usd_clp_t+2"] = df["usd_clp"].shift(-2)
-    df["usd_clp_t+3"] = df["usd_clp"].shift(-3)
+    # Se construye la matriz de adelantos y rezagos en una sola pasada sobre ventanas deslizantes.
+    # Cada fila de `usd_windows` contiene los precios en t-y_lags-1, ..., t+horizons (ver `lead_lag_windows`);
+    # las 2H+L+2 columnas finales se materializan una sola vez en `usd_features`.
+    usd = df["usd_clp"].to_numpy(dtype=float)
+    usd_windows = lead_lag_windows(usd, lags=y_lags, leads=horizons)
+    log_usd_windows = lead_lag_windows(np.log(usd), lags=y_lags, leads=horizons)
+    t0 = y_lags + 1
 
     # Se calcula primera diferencia para convertir la serie a estacionaria
-    df["y_t+0"] = np.log(df["usd_clp_t-1"]) - np.log(df["usd_clp"])
-    df["y_t-1"] = df["y_t+0"].shift(1)
-    df["y_t-2"] = df["y_t+0"].shift(2)
-
-    # 3 Step Ahead
-    df["y_t+1"] = np.log(df["usd_clp_t+1"]) - np.log(df["usd_clp"])
-    df["y_t+2"] = np.log(df["usd_clp_t+2"]) - np.log(df["usd_clp"])
-    df["y_t+3"] = np.log(df["usd_clp_t+3"]) - np.log(df["usd_clp"])
+    y_lag_matrix = (log_usd_windows[:, :t0] - log_usd_windows[:, 1:t0 + 1])[:, ::-1]
+
+    # H Step Ahead
+    y_lead_matrix = log_usd_windows[:, t0 + 1:] - log_usd_windows[:, [t0]]
+
+    usd_features = pd.DataFrame(
+        np.hstack([
+            usd_windows[:, [t0 - 1]],
+            usd_windows[:, t0 + 1:],
+            y_lag_matrix,
+            y_lead_matrix,
+        ]),
+        columns=(
+            ["usd_clp_t-1"]
+            + [f"usd_clp_t+{h}" for h in range(1, horizons + 1)]
+            + lag_names("y", y_lags)
+            + [f"y_t+{h}" for h in range(1, horizons + 1)]
+        ),
+        index=df.index,
+    )
+    df = pd.concat([df, usd_features], axis=1)
 
     # Precio del Cobre
     df_copper = get_yfinance_data(
@@ -130,19 +228,26 @@ def preprocessor(df: pd.DataFrame, market_calendar) -> pd.DataFrame:
         (df['copper_close'].shift(1) + df['copper_close'].shift(-1)) / 2)
 
     # Se calcula primera diferencia para convertir la serie a estacionaria
-    df["copper_t+0"] = np.log(df["copper_close"]) - \
-        np.log(df["copper_close"].shift())
-    df["copper_t-1"] = df["copper_t+0"].shift(1)
-    df["copper_t-2"] = df["copper_t+0"].shift(2)
-    df["copper_t-3"] = df["copper_t+0"].shift(3)
+    log_copper_windows = lead_lag_windows(
+        np.log(df["copper_close"].to_numpy(dtype=float)), lags=copper_lags
+    )
+    copper_features = pd.DataFrame(
+        (log_copper_windows[:, 1:] - log_copper_windows[:, :-1])[:, ::-1],
+        columns=lag_names("copper", copper_lags),
+        index=df.index,
+    )
+    df = pd.concat([df, copper_features], axis=1)
 
-    df.dropna(subset=["usd_clp", "copper_t-3"], inplace=True)
+    df.dropna(
+        subset=["usd_clp", lag_names("y", y_lags)[-1], lag_names("copper", copper_lags)[-1]],
+        inplace=True
+    )
 
     return df
 
 
 def train_inference_split(
-        df: pd.DataFrame, last_train_date: str, market_calendar: list
+        df: pd.DataFrame, last_train_date: str, market_calendar: list, horizons: int = DEFAULT_HORIZONS
 ) -> tuple[pd.DataFrame, pd.DataFrame, list]:
     """
     Divide un DataFrame de series de tiempo en conjuntos de entrenamiento e inferencia, y genera fechas futuras para predicciones.
@@ -166,7 +271,7 @@ def train_inference_split(
 
     5. **Generación de fechas futuras para predicciones:**
        - Combina las fechas del DataFrame con las del calendario de mercado y las ordena.
-       - Identifica las siguientes tres fechas después de `last_train_date` para utilizarlas en predicciones a futuro.
+       - Identifica las siguientes `horizons` fechas después de `last_train_date` para utilizarlas en predicciones a futuro.
 
     Parámetros
     ----------
@@ -179,24 +284,28 @@ def train_inference_split(
     market_calendar : list
         Lista de fechas que representan el calendario de mercado cambiario. Estas fechas se utilizarán para determinar días hábiles y generar fechas futuras para predicciones.
 
+    horizons : int, predeterminado=DEFAULT_HORIZONS (3)
+        Número de fechas futuras a generar, una por horizonte de predicción.
+
     Retorna
     -------
     tuple[pd.DataFrame, pd.DataFrame, list]
         - **df_train (pd.DataFrame):** Subconjunto del DataFrame original que contiene todas las filas con fechas menores o iguales a `last_train_date`.
         - **df_inference (pd.DataFrame):** Subconjunto del DataFrame original que contiene las filas con fecha exactamente igual a `last_train_date`.
-        - **next_dates (list):** Lista de tres cadenas de caracteres que representan las próximas fechas después de `last_train_date` en formato 'YYYY-MM-DD', basadas en el calendario de mercado.
+        - **next_dates (list):** Lista de `horizons` cadenas de caracteres que representan las próximas fechas después de `last_train_date` en formato 'YYYY-MM-DD', basadas en el calendario de mercado.
 
     Raises
     ------
     ValueError
         - Si no se encuentra ninguna fecha anterior a `last_train_date` en el DataFrame.
+        - Si el calendario no contiene `horizons` fechas posteriores a `last_train_date`.
 
     Notas
     -----
     - La función asume que la columna 'dates' en el DataFrame está correctamente formateada y contiene valores de fecha válidos.
     - Las fechas en `market_calendar` deben estar en un formato que pueda ser interpretado por `pd.to_datetime`.
     - La selección de las próximas fechas para predicciones se basa en la unión de las fechas del DataFrame y el calendario de mercado, asegurando que solo se consideren días hábiles definidos en el calendario.
-    - Es importante que `market_calendar` incluya al menos tres fechas posteriores a `last_train_date` para evitar errores al generar `next_dates`.
+    - Es importante que `market_calendar` incluya al menos `horizons` fechas posteriores a `last_train_date` para evitar errores al generar `next_dates`.
     """
 
     df = df.sort_values(by="dates").reset_index(drop=True)
@@ -219,7 +328,11 @@ def train_inference_split(
 
     current_index = all_dates.index(last_train_date)
 
-    next_dates_dt = all_dates[current_index + 1: current_index + 4]
+    next_dates_dt = all_dates[current_index + 1: current_index + 1 + horizons]
+    if len(next_dates_dt) < horizons:
+        raise ValueError(
+            "El calendario de mercado no contiene suficientes fechas posteriores a la fecha de corte."
+        )
     next_dates = [date.strftime('%Y-%m-%d') for date in next_dates_dt]
 
     return df_train, df_inference, next_dates
@@ -0,0 +1,381 @@
+import os
+import re
+import sys
+import time
+from collections import deque
+from math import log
+from typing import AsyncIterator, Callable
+
+import pandas as pd
+
+# fmt: off
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from lib.ring_buffer import RingBuffer
+from lib.ticks import Tick
+# fmt: on
+
+
+# Prefijo de cada variable independiente y el instrumento del que proviene.
+FEATURE_SYMBOLS = {"y": "usd_clp", "copper": "copper"}
+
+# Signo de la diferencia logarítmica de t+0 respecto a `preprocessor`:
+#   - y_t+0      = ln(usd_clp_t-1) - ln(usd_clp_t)
+#   - copper_t+0 = ln(copper_t) - ln(copper_t-1)
+RETURN_SIGNS = {"usd_clp": -1.0, "copper": 1.0}
+
+# Sesiones de desfase entre las cotizaciones de cada instrumento y su variable t+0 en el entrenamiento.
+# `get_yfinance_data` adelanta un día las fechas del cobre, por lo que 'copper_t+0' de la sesión D es
+# el retorno de la sesión anterior del cobre, ya conocido al abrir D. Las cotizaciones del cobre de
+# la sesión D solo entran al modelo como 'copper_t+0' de la sesión siguiente.
+SESSION_OFFSETS = {"usd_clp": 0, "copper": 1}
+
+FEATURE_PATTERN = re.compile(r"^(?P<prefix>[a-z]+)_t(?P<sign>[+-])(?P<lag>\d+)$")
+
+
+def parse_feature(name: str) -> tuple[str, int]:
+    """
+    Descompone el nombre de una variable independiente (e.g. 'copper_t-3') en el instrumento
+    asociado y su rezago (e.g. ('copper', 3)). Lanza `ValueError` si el nombre no corresponde
+    a un rezago soportado.
+    """
+    match = FEATURE_PATTERN.match(name)
+    if match is None or match["prefix"] not in FEATURE_SYMBOLS:
+        raise ValueError(f"Variable no soportada en modo streaming: {name!r}")
+    lag = int(match["lag"])
+    if match["sign"] == "+" and lag != 0:
+        raise ValueError(f"Variable adelantada no soportada en modo streaming: {name!r}")
+    return FEATURE_SYMBOLS[match["prefix"]], lag
+
+
+class LatencyStats:
+    """
+    Estadísticas de latencia por tick con memoria acotada.
+
+    El conteo, promedio y máximo se actualizan de forma incremental sobre todos los ticks. Los
+    percentiles se calculan sobre los últimos `window` ticks.
+
+    Parámetros
+    ----------
+    window : int, predeterminado=10_000
+        Número de latencias recientes que se conservan para el cálculo de percentiles.
+    """
+
+    def __init__(self, window: int = 10_000):
+        self.count = 0
+        self.mean = 0.0
+        self.max = 0.0
+        self._recent = deque(maxlen=window)
+
+    def add(self, latency: float) -> None:
+        self.count += 1
+        self.mean += (latency - self.mean) / self.count
+        self.max = max(self.max, latency)
+        self._recent.append(latency)
+
+    def percentile(self, q: float) -> float | None:
+        if not self._recent:
+            return None
+        ordered = sorted(self._recent)
+        index = min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))
+        return ordered[index]
+
+    def summary(self) -> dict:
+        """
+        Retorna el resumen de latencias en microsegundos.
+        """
+        def to_us(value):
+            return None if value is None else value * 1e6
+
+        return {
+            "ticks": self.count,
+            "mean_us": to_us(self.mean) if self.count else None,
+            "p50_us": to_us(self.percentile(0.50)),
+            "p95_us": to_us(self.percentile(0.95)),
+            "p99_us": to_us(self.percentile(0.99)),
+            "max_us": to_us(self.max) if self.count else None,
+        }
+
+
+class StreamingForecaster:
+    """
+    Actualiza los pronósticos por horizonte a medida que llegan cotizaciones de USD/CLP y cobre.
+
+    El estado de rezagos de cada instrumento se mantiene en un `RingBuffer` de tamaño fijo con las
+    diferencias logarítmicas de las sesiones cerradas, junto al logaritmo del último cierre. Durante
+    la sesión, solo cambia la componente `y_t+0`; el aporte del intercepto y de los rezagos cerrados
+    (incluidos todos los rezagos del cobre, ver `SESSION_OFFSETS`) se precalcula al inicio de cada
+    sesión, por lo que cada tick cuesta O(1) por horizonte utilizando los coeficientes ya estimados.
+
+    Parámetros
+    ----------
+    models : dict[int, TimeSeriesLinearRegression]
+        Modelos ajustados indexados por horizonte de predicción (e.g. {1: model_t1, 2: model_t2}).
+
+    independent_variables : list[str]
+        Variables independientes en el mismo orden utilizado en el ajuste de los modelos.
+
+    history : pd.DataFrame
+        Salida de `preprocessor` hasta la última fecha de entrenamiento. Se usa para inicializar
+        los últimos cierres y los rezagos de cada instrumento.
+
+    Raises
+    ------
+    ValueError
+        - Si alguna variable independiente no corresponde a un rezago soportado.
+        - Si `history` no contiene suficientes filas para completar los rezagos.
+
+    Notas
+    -----
+    - Para USD/CLP, la última fila de `history` se considera una sesión cerrada: el primer tick con
+      fecha posterior abre una sesión nueva sin agregar rezagos, ya que `y_t+0` de esa fila ya está
+      en el buffer.
+    - Para el cobre, `copper_close` de la última fila de `history` es el cierre de la sesión anterior
+      (fechas adelantadas un día), por lo que la sesión del cobre con la fecha de esa fila sigue
+      abierta: sus ticks determinan `copper_t+0` de la sesión siguiente.
+    - Un cambio de fecha en el `timestamp` de un tick cierra las sesiones abiertas: el último precio
+      recibido de cada instrumento pasa a ser su cierre y su diferencia logarítmica se agrega al
+      buffer de rezagos. Si un instrumento no cotizó en la sesión, su diferencia es 0.0.
+    - Los ticks con fecha anterior a la sesión actual, o de un instrumento cuya sesión ya está
+      cerrada, se ignoran y `update` retorna `None`.
+    - Mientras la sesión de USD/CLP esté cerrada (al inicio, con la fecha de la última fila de
+      `history`), los ticks del cobre solo actualizan su precio y `update` retorna `None`: no existe
+      un pronóstico válido que reportar hasta que abre la sesión siguiente.
+    - Dentro de una sesión, los ticks del cobre no modifican el pronóstico (ver `SESSION_OFFSETS`):
+      se almacena su precio y `update` retorna `None`. Solo se reporta el tick del cobre que abre
+      una sesión nueva, ya que desplaza los rezagos.
+    - Hasta recibir la primera cotización de USD/CLP en la sesión, `y_t+0` es 0.0.
+    - Los pronósticos en pesos se calculan igual que en `main.py`: `usd_t+0 * (1 + variación)`.
+    """
+
+    def __init__(self, models: dict, independent_variables: list[str], history: pd.DataFrame):
+        features = [parse_feature(name) for name in independent_variables]
+
+        self.horizons = sorted(models)
+        self.session_date = pd.to_datetime(history["dates"].iloc[-1]).date()
+
+        # Posición en el buffer de sesiones cerradas de cada variable; -1 indica componente en vivo.
+        positions = [
+            (symbol, lag + SESSION_OFFSETS[symbol] - 1) for symbol, lag in features
+        ]
+        capacity = {symbol: 1 for symbol in RETURN_SIGNS}
+        for symbol, k in positions:
+            capacity[symbol] = max(capacity[symbol], k + 1)
+
+        if len(history) < max(capacity.values()):
+            raise ValueError("history no contiene suficientes filas para inicializar los rezagos.")
+
+        # Diferencias logarítmicas de sesiones cerradas: lag(0) es la sesión cerrada más reciente.
+        self._returns = {}
+        self._last_close = {}
+        for symbol, column, price in [
+            ("usd_clp", "y_t+0", "usd_clp"),
+            ("copper", "copper_t+0", "copper_close"),
+        ]:
+            buffer = RingBuffer(capacity=capacity[symbol])
+            for value in history[column].iloc[-capacity[symbol]:]:
+                buffer.push(float(value))
+            self._returns[symbol] = buffer
+            self._last_close[symbol] = log(float(history[price].iloc[-1]))
+
+        self._last_price = dict(self._last_close)
+        # Último precio de USD/CLP sin transformar, para reportar `usd_t+0` sin pasar por `log`/`exp`.
+        self._last_usd_price = float(history["usd_clp"].iloc[-1])
+        self._session_open = {
+            symbol: SESSION_OFFSETS[symbol] > 0 for symbol in RETURN_SIGNS
+        }
+        # Instrumentos cuyas cotizaciones de la sesión entran al modelo como componente t+0.
+        self._live_symbols = [
+            symbol for symbol in RETURN_SIGNS if SESSION_OFFSETS[symbol] == 0
+        ]
+
+        # Coeficientes por horizonte separados entre componente t+0 y rezagos cerrados.
+        self._intercept = {}
+        self._coef_t0 = {}
+        self._coef_lags = {}
+        self._half_width = {}
+        for h in self.horizons:
+            model = models[h]
+            coef = model.model_.coef_
+            self._intercept[h] = float(model.model_.intercept_)
+            self._coef_t0[h] = {symbol: 0.0 for symbol in RETURN_SIGNS}
+            self._coef_lags[h] = []
+            for (symbol, k), value in zip(positions, coef):
+                if k < 0:
+                    self._coef_t0[h][symbol] += float(value)
+                else:
+                    self._coef_lags[h].append((symbol, k, float(value)))
+            if model.std_residual_ is not None and model.z_score_ is not None:
+                self._half_width[h] = float(model.z_score_ * model.std_residual_)
+            else:
+                self._half_width[h] = None
+
+        self._lag_part = {}
+        self._refresh_lag_part()
+
+    def _refresh_lag_part(self) -> None:
+        for h in self.horizons:
+            self._lag_part[h] = self._intercept[h] + sum(
+                value * self._returns[symbol].lag(k)
+                for symbol, k, value in self._coef_lags[h]
+            )
+
+    def _roll_session(self, new_date) -> None:
+        for symbol, sign in RETURN_SIGNS.items():
+            if self._session_open[symbol]:
+                self._returns[symbol].push(
+                    sign * (self._last_price[symbol] - self._last_close[symbol])
+                )
+                self._last_close[symbol] = self._last_price[symbol]
+            self._session_open[symbol] = True
+        self.session_date = new_date
+        self._refresh_lag_part()
+
+    def update(self, tick: Tick) -> dict | None:
+        """
+        Incorpora una cotización y retorna el pronóstico actualizado para todos los horizontes.
+        Retorna `None` si el tick pertenece a una sesión ya cerrada, si aún no hay una sesión de
+        USD/CLP abierta o si el tick no modifica el pronóstico.
+        """
+        tick_date = tick.timestamp.date()
+        rolled = tick_date > self.session_date
+        if rolled:
+            self._roll_session(tick_date)
+        elif tick_date < self.session_date or not self._session_open[tick.symbol]:
+            return None
+
+        self._last_price[tick.symbol] = log(tick.price)
+        if tick.symbol == "usd_clp":
+            self._last_usd_price = tick.price
+        if not all(self._session_open[symbol] for symbol in self._live_symbols):
+            return None
+        if not rolled and tick.symbol not in self._live_symbols:
+            return None
+
+        current = {
+            symbol: sign * (self._last_price[symbol] - self._last_close[symbol])
+            for symbol, sign in RETURN_SIGNS.items()
+        }
+        y_t0 = self._last_usd_price
+
+        forecast = {}
+        for h in self.horizons:
+            coef_t0 = self._coef_t0[h]
+            y_pred = self._lag_part[h] + sum(
+                coef_t0[symbol] * current[symbol] for symbol in RETURN_SIGNS
+            )
+            half_width = self._half_width[h]
+            interval = None if half_width is None else [
+                y_t0 * (1 + y_pred - half_width),
+                y_t0 * (1 + y_pred + half_width),
+            ]
+            forecast[f"t+{h}"] = {
+                "usd_t+0": y_t0,
+                "usd_forecast": y_t0 * (1 + y_pred),
+                "usd_forecast_interval": interval,
+                "variation_forecast": y_pred,
+            }
+
+        return {
+            "timestamp": tick.timestamp.isoformat(),
+            "symbol": tick.symbol,
+            "price": tick.price,
+            "forecast": forecast,
+        }
+
+
+async def run_stream(
+    forecaster: StreamingForecaster,
+    source: AsyncIterator[Tick],
+    on_forecast: Callable[[dict], None] | None = None,
+    latency_window: int = 10_000
+) -> dict:
+    """
+    Consume una fuente de cotizaciones, actualiza el pronóstico por cada tick y mide la latencia
+    extremo a extremo (desde la recepción del tick hasta que el pronóstico está disponible).
+
+    Solo los ticks que generan un pronóstico entran a las estadísticas de latencia; los demás
+    (e.g. cobre dentro de la sesión o ticks de sesiones cerradas) se cuentan en
+    `ticks_without_forecast`.
+
+    Parámetros
+    ----------
+    forecaster : StreamingForecaster
+        Estado del pronóstico inicializado con los modelos ajustados.
+
+    source : AsyncIterator[Tick]
+        Fuente de cotizaciones, e.g. `file_tick_source` o `socket_tick_source` de `lib.ticks`.
+
+    on_forecast : Callable[[dict], None], opcional
+        Función que recibe cada pronóstico actualizado. Su tiempo de ejecución no se incluye
+        en la latencia reportada.
+
+    latency_window : int, predeterminado=10_000
+        Número de ticks recientes utilizados para los percentiles de latencia.
+
+    Retorna
+    -------
+    dict
+        Resumen de latencias por tick en microsegundos (ver `LatencyStats.summary`), más el número
+        de ticks que no generaron pronóstico.
+    """
+    stats = LatencyStats(window=latency_window)
+    ticks_without_forecast = 0
+
+    async for tick in source:
+        report = forecaster.update(tick)
+        if report is None:
+            ticks_without_forecast += 1
+            continue
+        stats.add(time.perf_counter() - tick.received_at)
+        if on_forecast is not None:
+            on_forecast(report)
+
+    return {**stats.summary(), "ticks_without_forecast": ticks_without_forecast}
+
+
+def check_against_batch(
+    models: dict,
+    independent_variables: list[str],
+    history: pd.DataFrame,
+    tol: float = 1e-9
+) -> None:
+    """
+    Verifica que el modo streaming reproduzca la predicción batch de la última fila de `history`.
+
+    Se inicializa un `StreamingForecaster` con todas las filas salvo la última y se le
+    entregan como ticks los cierres correspondientes: el cobre de la penúltima fecha (que en
+    `history` aparece como `copper_close` de la última fila, ver `SESSION_OFFSETS`) y el USD/CLP de
+    la última fecha. La variación pronosticada debe coincidir con `model.predict` sobre la última
+    fila para cada horizonte. El tick del cobre llega mientras la sesión de USD/CLP está cerrada,
+    por lo que no debe generar un pronóstico.
+
+    Raises
+    ------
+    ValueError
+        - Si el tick del cobre de la sesión cerrada genera un pronóstico.
+        - Si la diferencia entre ambas predicciones supera `tol` en algún horizonte.
+    """
+    last = history.iloc[-1]
+    last_date = pd.to_datetime(last["dates"]).to_pydatetime()
+    previous_date = pd.to_datetime(history["dates"].iloc[-2]).to_pydatetime()
+
+    forecaster = StreamingForecaster(models, independent_variables, history.iloc[:-1])
+    copper_tick = Tick(timestamp=previous_date, symbol="copper",
+                       price=float(last["copper_close"]), received_at=time.perf_counter())
+    if forecaster.update(copper_tick) is not None:
+        raise ValueError(
+            "Un tick del cobre con la sesión de USD/CLP cerrada no debe generar un pronóstico."
+        )
+
+    usd_tick = Tick(timestamp=last_date, symbol="usd_clp",
+                    price=float(last["usd_clp"]), received_at=time.perf_counter())
+    report = forecaster.update(usd_tick)
+
+    X_last = history[independent_variables].iloc[[-1]]
+    for h in forecaster.horizons:
+        y_batch, _, _ = models[h].predict(X_last)
+        y_stream = report["forecast"][f"t+{h}"]["variation_forecast"]
+        if abs(y_stream - y_batch) > tol:
+            raise ValueError(
+                f"El pronóstico streaming (t+{h}) no coincide con el batch: {y_stream} != {y_batch}"
+            )